@@ -0,0 +1,144 @@
+"""Memory and latency of the server with many idle Socket.IO connections.
+
+Starts the app in a scratch directory, opens 100, 1000 and 10000 idle
+WebSocket connections and, at each level, prints the server's resident
+memory and the latency of plain HTTP requests made meanwhile. Runs the
+threading and the eventlet mode one after another; LIBERTALK_ASYNC_MODE
+picks a single one.
+
+Needs eventlet on the server side and python-socketio's asyncio client
+with aiohttp on this side:
+    pip install eventlet aiohttp
+Run from the repository root: python benchmarks/bench_connections.py
+"""
+import asyncio
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import socketio
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PORT = int(os.environ.get('BENCH_PORT', 5099))
+URL = f'http://127.0.0.1:{PORT}'
+LEVELS = (100, 1000, 10000)
+MODES = (os.environ['LIBERTALK_ASYNC_MODE'],) if os.environ.get('LIBERTALK_ASYNC_MODE') else ('threading', 'eventlet')
+CONNECT_CONCURRENCY = 50
+LATENCY_SAMPLES = 200
+
+
+# Как в app.py под __main__, но без отладчика: в режиме threading он
+# запускает сервер в дочернем процессе и требует терминал
+RUNNER = """
+import app
+app.get_db()
+if app.ASYNC_MODE == 'threading':
+    options = {{'allow_unsafe_werkzeug': True}}
+else:
+    options = {{'max_size': app.app.config['MAX_CONNECTIONS']}}
+app.socketio.run(app.app, host='127.0.0.1', port={port}, **options)
+"""
+
+
+def start_server(mode):
+    workdir = tempfile.mkdtemp(prefix='libertalk-bench-')
+    shutil.copy(os.path.join(ROOT, 'app.py'), workdir)
+    for folder in ('templates', 'static'):
+        shutil.copytree(os.path.join(ROOT, folder), os.path.join(workdir, folder))
+    env = dict(os.environ, LIBERTALK_ASYNC_MODE=mode)
+    server = subprocess.Popen([sys.executable, '-c', RUNNER.format(port=PORT)], cwd=workdir, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                              preexec_fn=raise_fd_limit)
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(URL + '/login').read()
+            return server, workdir
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError('server did not start')
+
+
+def raise_fd_limit():
+    # Каждое соединение - файловый дескриптор на обеих сторонах
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def rss_mb(pid):
+    with open(f'/proc/{pid}/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def open_connections(clients, count):
+    """Open connections up to `count` in total; return how many failed"""
+    semaphore = asyncio.Semaphore(CONNECT_CONCURRENCY)
+    failed = 0
+
+    async def connect():
+        nonlocal failed
+        async with semaphore:
+            client = socketio.AsyncClient(reconnection=False)
+            try:
+                await client.connect(URL, transports=['websocket'], wait_timeout=10)
+            except (socketio.exceptions.ConnectionError, asyncio.TimeoutError, OSError):
+                failed += 1
+                await client.shutdown()
+                return
+            clients.append(client)
+
+    await asyncio.gather(*(connect() for _ in range(count - len(clients))))
+    return failed
+
+
+def request_latencies():
+    latencies = []
+    for _ in range(LATENCY_SAMPLES):
+        started = time.perf_counter()
+        urllib.request.urlopen(URL + '/login').read()
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    return latencies
+
+
+async def bench(mode):
+    server, workdir = start_server(mode)
+    clients = []
+    try:
+        print(f'\n{mode}')
+        print(f'{"connections":>11} {"open":>6} {"failed":>6} {"rss MB":>8} {"p50 ms":>8} {"p99 ms":>8}')
+        print(f'{0:>11} {0:>6} {0:>6} {rss_mb(server.pid):>8.1f}')
+        for level in LEVELS:
+            failed = await open_connections(clients, level)
+            # Дать серверу обработать подключения и освободить буферы
+            await asyncio.sleep(2)
+            latencies = await asyncio.get_running_loop().run_in_executor(None, request_latencies)
+            # Сервер мог закрыть часть соединений, не дождавшись ответа на ping
+            connected = sum(client.connected for client in clients)
+            print(f'{level:>11} {connected:>6} {failed:>6} {rss_mb(server.pid):>8.1f} '
+                  f'{statistics.median(latencies):>8.2f} '
+                  f'{latencies[int(len(latencies) * 0.99) - 1]:>8.2f}')
+    finally:
+        await asyncio.gather(*(client.disconnect() for client in clients), return_exceptions=True)
+        server.terminate()
+        server.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+async def main():
+    raise_fd_limit()
+    for mode in MODES:
+        await bench(mode)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+"""Storage and response timings for rooms of 1k, 10k and 100k messages.
+
+For every room size prints the mean time of adding a message, loading the
+newest page and a page from the middle of the history, loading one
+message by id, updating a message, and serving /get_messages. The JSON
+parts (row decode/encode and the response) are timed with orjson and
+with the standard library.
+
+Run from the repository root: python benchmarks/bench_storage.py
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# База и файлы приложения создаются во временной папке
+os.chdir(tempfile.mkdtemp(prefix='libertalk-bench-'))
+os.environ.setdefault('LIBERTALK_FLUSH_INTERVAL', '0.5')
+
+import app as A  # noqa: E402
+
+SIZES = (1000, 10000, 100000)
+REPEAT = 200
+USERS = [f'user{i}' for i in range(50)]
+
+
+def timed(func, repeat=REPEAT):
+    """Mean time of one call in microseconds"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def make_message(n):
+    return {
+        'id': str(uuid.uuid4()), 'type': 'text', 'username': random.choice(USERS),
+        'timestamp': datetime.now().isoformat(),
+        'message': f'Сообщение номер {n}: немного текста, чтобы строка была похожа на настоящую',
+        'reactions': {'👍': set(random.sample(USERS, 3))} if n % 5 == 0 else {},
+    }
+
+
+def fill_room(room_name, count):
+    A.save_room(room_name, {'type': 'open', 'password': '', 'created_by': 'user0',
+                            'created_at': datetime.now().isoformat(), 'moderators': [], 'banned_users': []})
+    ids = []
+    started = time.perf_counter()
+    for n in range(count):
+        message = make_message(n)
+        A.add_message(room_name, message)
+        ids.append(message['id'])
+    A.flush_storage()
+    return ids, (time.perf_counter() - started) / count * 1e6
+
+
+def with_backend(use_orjson, func):
+    saved = A.orjson
+    if not use_orjson:
+        A.orjson = None
+    try:
+        return func()
+    finally:
+        A.orjson = saved
+
+
+def main():
+    A.app.config['TESTING'] = True
+    client = A.app.test_client()
+    client.post('/register', data={'username': 'user0', 'password': 'p', 'confirm_password': 'p'})
+    backends = [True, False] if A.orjson is not None else [False]
+    print('orjson is not installed, timing the standard library only' if len(backends) == 1 else
+          'JSON timings: orjson / stdlib')
+    for size in SIZES:
+        room_name = f'bench{size}'
+        ids, add_time = fill_room(room_name, size)
+        rows = {}
+        with A._db_lock:
+            rows['seq'], rows['data'] = A.get_db().execute(
+                'SELECT seq, data FROM messages WHERE room = ? LIMIT 1', (room_name,)).fetchone()
+        message = A._decode_message(rows['seq'], rows['data'])
+
+        def update():
+            A.update_message(room_name, random.choice(ids),
+                             lambda message: A.set_reaction(message, '🔥', random.choice(USERS), True))
+
+        def json_times(func):
+            return ' / '.join(f'{with_backend(backend, lambda: timed(func)):.1f}' for backend in backends)
+
+        print(f'\n{size} messages')
+        print(f'  add_message            {add_time:10.1f} us')
+        print(f'  newest page            {timed(lambda: A.load_messages(room_name)):10.1f} us')
+        print(f'  middle page            {timed(lambda: A.load_messages(room_name, before=size // 2)):10.1f} us')
+        print(f'  load_message           {timed(lambda: A.load_message(room_name, random.choice(ids))):10.1f} us')
+        print(f'  update_message         {timed(update):10.1f} us')
+        print(f'  decode row             {json_times(lambda: A._decode_message(rows["seq"], rows["data"]))} us')
+        print(f'  encode row             {json_times(lambda: A._encode_message(message))} us')
+        print(f'  GET /get_messages      {json_times(lambda: client.get(f"/get_messages/{room_name}"))} us')
+        A.flush_storage()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Bytes and CPU per event: JSON wire format vs the compact one.
+
+Encodes typical new_message, reactions_updated and poll_updated payloads
+the way they go out to clients and prints the size and encoding time of
+each. Also times broadcast() in a room without compact subscribers, where
+the compact copy should cost nothing but the subscriber check.
+
+Run from the repository root: python benchmarks/bench_wire_format.py
+"""
+import json
+import os
+import sys
+import tempfile
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# База и файлы приложения создаются во временной папке
+os.chdir(tempfile.mkdtemp(prefix='libertalk-bench-'))
+
+import app as A  # noqa: E402
+
+REPEAT = 20000
+
+
+def sample_events():
+    message = {
+        'id': '0f8fad5b-d9cb-469f-a165-70867728950e', 'seq': 123456, 'type': 'text',
+        'username': 'alice', 'role': 'user', 'timestamp': '2024-05-01T12:34:56.789012',
+        'message': 'Привет! Как дела с релизом? Созвонимся вечером, обсудим план.',
+        'reactions': {'👍': {'bob', 'carol', 'dave'}, '🔥': {'erin'}},
+    }
+    poll = {
+        'id': '7c9e6679-7425-40de-944b-e07fc1f90ae7', 'seq': 123457, 'type': 'poll',
+        'username': 'bob', 'role': 'moderator', 'timestamp': '2024-05-01T12:35:10.000000',
+        'question': 'Когда встречаемся?',
+        'options': [{'text': text, 'votes': votes, 'voters': {f'u{i}' for i in range(votes)}}
+                    for text, votes in (('Пятница', 12), ('Суббота', 30), ('Воскресенье', 7))],
+        'total_votes': 49, 'voters': {f'u{i}' for i in range(49)},
+    }
+    return {
+        'new_message': {'message': dict(A.serialize_message(message), avatar='default_avatar.png'),
+                        'room': 'general'},
+        'reactions_updated': {'message_id': message['id'], 'counts': {'👍': 4, '🔥': 1},
+                              'actions': [['frank', '👍', 1]]},
+        'poll_updated': A.poll_counts(poll),
+    }
+
+
+def json_wire(data):
+    # Так событие кодирует python-socketio для обычных клиентов
+    return json.dumps(data).encode('utf-8')
+
+
+def main():
+    print(f"compact body: {'msgpack' if A.msgpack is not None else 'json'}, "
+          f"json serializer: {'orjson' if A.orjson is not None else 'stdlib'}")
+    print(f"{'event':<18} {'json B':>7} {'compact B':>9} {'json us':>8} {'compact us':>10}")
+    for name, data in sample_events().items():
+        json_time = timeit.timeit(lambda: json_wire(data), number=REPEAT) / REPEAT * 1e6
+        compact_time = timeit.timeit(lambda: A.encode_compact(data), number=REPEAT) / REPEAT * 1e6
+        print(f'{name:<18} {len(json_wire(data)):>7} {len(A.encode_compact(data)):>9} '
+              f'{json_time:>8.1f} {compact_time:>10.1f}')
+
+    # Полная рассылка: без компактных клиентов и с одним
+    data = sample_events()['new_message']
+    A.socketio.emit = lambda *args, **kwargs: None
+    A.get_db()
+    number = REPEAT // 10
+    plain = timeit.timeit(lambda: A.broadcast('new_message', data, 'bench'), number=number) / number * 1e6
+    A.set_wire_subscriber('bench', 'sid', True)
+    both = timeit.timeit(lambda: A.broadcast('new_message', data, 'bench'), number=number) / number * 1e6
+    print(f'broadcast new_message: {plain:.1f} us without compact subscribers, {both:.1f} us with')
+
+
+if __name__ == '__main__':
+    main()
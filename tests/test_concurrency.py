@@ -0,0 +1,179 @@
+"""Stress test for the read-modify-write handlers.
+
+Run from the repository root: python -m pytest tests
+"""
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+THREADS = 20
+# Потоки и комнаты для замера пропускной способности
+SCALE_THREADS = 8
+SCALE_OPS = 20
+# Блокирующее ожидание (ввод-вывод) под замком комнаты в одной операции
+SCALE_HOLD = 0.005
+
+
+@pytest.fixture(scope='module')
+def app_module(tmp_path_factory):
+    # Приложение работает с файлами относительно текущей папки
+    workdir = tmp_path_factory.mktemp('libertalk')
+    os.makedirs(workdir / 'static' / 'uploads')
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    os.environ['LIBERTALK_FLUSH_INTERVAL'] = '0.05'
+    import app
+    app.app.config['TESTING'] = True
+    app.app.template_folder = os.path.join(ROOT, 'templates')
+    yield app
+    app.flush_storage()
+    os.chdir(cwd)
+
+
+def make_client(app_module, username):
+    client = app_module.app.test_client()
+    client.post('/register', data={'username': username, 'password': 'p', 'confirm_password': 'p'})
+    return client
+
+
+def post_message(client, room_name, **fields):
+    response = client.post(f'/room/{room_name}', data=fields, headers={'Accept': 'application/json'})
+    return response.get_json()['message_id']
+
+
+def run_threads(target, args_list):
+    threads = [threading.Thread(target=target, args=args) for args in args_list]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_no_lost_updates(app_module):
+    admin = make_client(app_module, 'admin')
+    admin.post('/create_room', data={'room_name': 'stress', 'room_type': 'open'})
+    message_id = post_message(admin, 'stress', message_type='text', message='hi')
+    poll_id = post_message(admin, 'stress', message_type='poll', poll_question='q',
+                           **{'poll_options[]': ['a', 'b']})
+    clients = [make_client(app_module, f'user{i}') for i in range(THREADS)]
+    errors = []
+
+    def work(client, i):
+        try:
+            for n in range(5):
+                post_message(client, 'stress', message_type='text', message=f'{i}-{n}')
+            assert client.post('/add_reaction/stress', json={'message_id': message_id, 'emoji': '+'}).status_code == 200
+            assert client.post('/toggle_reaction/stress', json={'message_id': message_id, 'emoji': '*'}).status_code == 200
+            assert client.post(f'/vote/stress/{poll_id}', json={'option_index': i % 2}).status_code == 200
+        except Exception as e:
+            errors.append(e)
+
+    run_threads(work, [(client, i) for i, client in enumerate(clients)])
+    assert errors == []
+
+    message = app_module.load_message('stress', message_id)
+    users = {f'user{i}' for i in range(THREADS)}
+    assert message['reactions'] == {'+': users, '*': users}
+    poll = app_module.load_message('stress', poll_id)
+    assert poll['total_votes'] == THREADS
+    assert [option['votes'] for option in poll['options']] == [THREADS // 2, THREADS // 2]
+    assert poll['voters'] == users
+    messages = admin.get('/get_messages/stress?limit=500').get_json()
+    assert len(messages) == THREADS * 5 + 2
+
+
+def test_rooms_do_not_wait_for_each_other(app_module):
+    admin = make_client(app_module, 'owner')
+    # Две комнаты на разных замках
+    names = iter(f'room{i}' for i in range(1000))
+    busy = next(names)
+    free = next(name for name in names
+                if app_module.room_lock(name) is not app_module.room_lock(busy))
+    for name in (busy, free):
+        admin.post('/create_room', data={'room_name': name, 'room_type': 'open'})
+    message_id = post_message(admin, free, message_type='text', message='hi')
+    done = threading.Event()
+
+    def react():
+        admin.post(f'/add_reaction/{free}', json={'message_id': message_id, 'emoji': '+'})
+        done.set()
+
+    with app_module.room_lock(busy):
+        thread = threading.Thread(target=react)
+        thread.start()
+        assert done.wait(5), 'a busy room blocked another room'
+    thread.join()
+    assert app_module.load_message(free, message_id)['reactions'] == {'+': {'owner'}}
+
+
+def distinct_rooms(app_module, prefix, count):
+    """Names of `count` rooms that all map to different room locks"""
+    names, locks = [], set()
+    for i in range(10000):
+        name = f'{prefix}{i}'
+        if id(app_module.room_lock(name)) not in locks:
+            locks.add(id(app_module.room_lock(name)))
+            names.append(name)
+            if len(names) == count:
+                return names
+    raise AssertionError('not enough room lock stripes')
+
+
+def ops_per_second(work, rooms, ops):
+    """Run work(thread_index, room) in SCALE_THREADS threads spread over `rooms`"""
+    started = time.perf_counter()
+    run_threads(work, [(i, rooms[i % len(rooms)]) for i in range(SCALE_THREADS)])
+    return SCALE_THREADS * ops / (time.perf_counter() - started)
+
+
+def test_throughput_scales_with_rooms(app_module):
+    admin = make_client(app_module, 'scaler')
+    rooms = distinct_rooms(app_module, 'scale', SCALE_THREADS)
+    message_ids = {}
+    for name in rooms:
+        admin.post('/create_room', data={'room_name': name, 'room_type': 'open'})
+        message_ids[name] = post_message(admin, name, message_type='text', message='hi')
+    clients = [make_client(app_module, f'scaler{i}') for i in range(SCALE_THREADS)]
+
+    # Цепочка "прочитать - изменить - сохранить", которая часть времени ждет
+    # под замком комнаты, не занимая ни GIL, ни соединение с базой
+    def locked_work(i, room_name):
+        for n in range(SCALE_OPS):
+            def change(message):
+                time.sleep(SCALE_HOLD)
+                return app_module.set_reaction(message, str(n % 4), f'scaler{i}', True)
+            with app_module.room_lock(room_name):
+                app_module.update_message(room_name, message_ids[room_name], change)
+
+    one_room = ops_per_second(locked_work, rooms[:1], SCALE_OPS)
+    all_rooms = ops_per_second(locked_work, rooms, SCALE_OPS)
+    print(f'\nwaiting under the room lock: 1 room {one_room:.0f} ops/s, '
+          f'{len(rooms)} rooms {all_rooms:.0f} ops/s')
+    assert all_rooms > one_room * SCALE_THREADS / 2
+
+    # Обычные запросы почти целиком работают на CPU под GIL, а запросы к базе
+    # идут через одно соединение под _db_lock; здесь проверяется только то,
+    # что замки комнат не добавляют к этому своей очереди
+    def http_work(i, room_name):
+        for n in range(SCALE_OPS):
+            clients[i].post(f'/toggle_reaction/{room_name}',
+                            json={'message_id': message_ids[room_name], 'emoji': str(n % 4)})
+            post_message(clients[i], room_name, message_type='text', message=f'{i}-{n}')
+
+    one_room = ops_per_second(http_work, rooms[:1], SCALE_OPS * 2)
+    all_rooms = ops_per_second(http_work, rooms, SCALE_OPS * 2)
+    print(f'HTTP handlers: 1 room {one_room:.0f} ops/s, {len(rooms)} rooms {all_rooms:.0f} ops/s')
+    assert all_rooms > one_room * 0.7
+
+
+def test_room_lock_table_does_not_grow(app_module):
+    client = make_client(app_module, 'guest')
+    for i in range(1000):
+        client.post(f'/add_reaction/missing{i}', json={'message_id': 'x', 'emoji': '+'})
+    assert len(app_module._room_locks) == app_module.ROOM_LOCK_STRIPES